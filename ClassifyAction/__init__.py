@@ -1,8 +1,23 @@
 """Activity function to execute classification of search result"""
 
-import aiohttp
+import asyncio
 import Config
+import hashlib
 import logging
+import orjson
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import ContentSettings
+from azure.storage.blob.aio import ContainerClient
+
+# Max number of concurrent calls to the classifier from this worker process,
+# across all activity calls. The semaphore guarding it is created on first
+# use by `_get_classify_semaphore()`, as it needs the running event loop.
+_max_concurrent_requests = 8
+_classify_semaphore = None
+
+# Classifications in progress in this worker process, by cache key
+_pending_scores = {}
 
 def to_classify_snippet(item:dict) -> dict:
     """Helper function to transform a processed search result into a classify request snippet object
@@ -70,20 +85,210 @@ def get_default_score(item:dict, error:str) -> dict:
         'title': item['title']
     }
 
-async def main(input: tuple[str,str,list[dict]]) -> list[dict]:
-    """Submits a batch of prepared search results for classification
+def _get_cache_key(search_term: str, classify_snippet: dict) -> str:
+    """Makes the key of the classification result cache for a snippet
+    
+    Parameters
+    ----------
+    search_term: str
+        The name the search was made for
+    classify_snippet: dict
+        Classify snippet dictionary (as created by `to_classify_snippet`)
+
+    Returns
+    -------
+    str
+        Hash of everything sent to the classifier for the snippet,
+        and of the classifier identity (url and version), so results
+        of a changed classifier are not used.
+    """
+
+    data = orjson.dumps({
+        'classifier': Config.get_classify_url(),
+        'classifier_version': Config.get_classify_cache_version(),
+        'name': search_term, 
+        'snippet': classify_snippet
+    }, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+async def _read_cached_score(container_client: ContainerClient, key: str) -> dict:
+    """Reads a cached classification result, returns None if not cached"""
+
+    try:
+        blob_downloader = await container_client.get_blob_client(f'{key}.json').download_blob()
+        return orjson.loads(await blob_downloader.readall())
+    except ResourceNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f'Failed to read cached classification result {key}: {e}')
+        return None
+
+async def _write_cached_score(container_client: ContainerClient, key: str, score: dict):
+    """Writes a classification result to the cache, failures are only logged"""
+
+    try:
+        await container_client.get_blob_client(f'{key}.json').upload_blob(
+            data=orjson.dumps(score),
+            overwrite=True,
+            content_settings=ContentSettings(content_type='application/json')
+        )
+    except Exception as e:
+        logging.warning(f'Failed to cache classification result {key}: {e}')
+
+def _get_classify_semaphore() -> asyncio.Semaphore:
+    """Gets the semaphore limiting the number of concurrent calls to the classifier"""
+
+    global _classify_semaphore
+    if _classify_semaphore is None:
+        _classify_semaphore = asyncio.Semaphore(_max_concurrent_requests)
+
+    return _classify_semaphore
+
+async def _post_snippets(search_term: str, snippets: list[dict]) -> list[dict]:
+    """Posts classify snippets to the classifier, returns the scores in the same order"""
+
+    request_data = {
+        'name': search_term,
+        'snippets': snippets
+    }
+
+    classify_url = Config.get_classify_url()
+
+    client = await Config.get_http_session()
+    async with _get_classify_semaphore():
+        # A new headers dictionary per request, as the request tracing adds its headers to it
+        headers = {'Content-Type': 'application/json'}
+        # orjson is used as it is a lot faster than the standard library
+        # for the large request bodies (orjson.dumps returns bytes)
+        async with client.post(classify_url, data=orjson.dumps(request_data), headers=headers) as response:
+            response.raise_for_status()
+            response_data = orjson.loads(await response.read())
+            return response_data['scores']
+
+async def _get_scores(search_term: str, items: list[dict]) -> list[dict]:
+    """Gets the classification results of a batch of search results
+    
+    Classification results are cached in blob storage, only snippets that
+    are not cached are posted to the classifier.
+
+    If a snippet is already being classified by another call in this worker
+    process, the result of that call is awaited instead of posting it again.
+
+    Parameters
+    ----------
+    search_term: str
+        The name the search was made for
+    items: list[dict]
+        Batch of processed search results to classify
+
+    Returns
+    -------
+    list[dict]
+        The classification results in the same order as the items.
+        None for items that could not be classified.
+    """
+
+    snippets = [to_classify_snippet(item) for item in items]
+    keys = [_get_cache_key(search_term, snippet) for snippet in snippets]
+
+    # Without the cache container, everything is classified
+    container_client = await Config.get_classify_cache_container_client()
+    if container_client is not None:
+        scores = await asyncio.gather(*[_read_cached_score(container_client, key) for key in keys])
+    else:
+        scores = [None] * len(keys)
+
+    # Classify the snippets not cached and not already being classified
+    loop = asyncio.get_running_loop()
+    owned = []
+    awaited = []
+    for (index, score) in enumerate(scores):
+        if score is not None:
+            continue
+
+        pending_score = _pending_scores.get(keys[index])
+        if pending_score is None:
+            pending_score = loop.create_future()
+            _pending_scores[keys[index]] = pending_score
+            owned.append((index, pending_score))
+        else:
+            awaited.append((index, pending_score))
+
+    try:
+        if owned:
+            new_scores = await _post_snippets(search_term, [snippets[index] for (index, _) in owned])
+            for ((index, pending_score), score) in zip(owned, new_scores):
+                scores[index] = score
+                pending_score.set_result(score)
+
+            # Scores the classifier reported errors for are not cached
+            if container_client is not None:
+                await asyncio.gather(*[
+                    _write_cached_score(container_client, keys[index], scores[index]) 
+                    for (index, _) in owned 
+                    if scores[index] and not scores[index]['error']
+                ])
+    finally:
+        # Anyone waiting for a failed classification gets no result
+        for (index, pending_score) in owned:
+            if not pending_score.done():
+                pending_score.set_result(None)
+            _pending_scores.pop(keys[index], None)
+
+    for (index, pending_score) in awaited:
+        scores[index] = await pending_score
+
+    return scores
+
+async def _classify_batch(search_term: str, items: list[dict]) -> list[dict]:
+    """Classifies a single batch of prepared search results
+
+    Parameters
+    ----------
+    search_term: str
+        The name the search was made for
+    items: list[dict]
+        Batch of processed search results to classify
+
+    Returns
+    -------
+    list[dict]
+        The items with classification results applied.
+        If classification fails, the default score is applied.
+    """
+
+    try:
+        scores = await _get_scores(search_term, items)
+    except Exception as e:
+        logging.exception('Error while classifying batch', exc_info=e)
+        scores = [None] * len(items)
+
+    return [
+        to_scored_item(item, score if score is not None else get_default_score(item, 'Classification call failed')) 
+        for (item, score) in zip(items, scores)
+    ]
+
+async def main(input: tuple[str,str,list]) -> list[dict]:
+    """Submits one or more batches of prepared search results for classification
     
+    Multiple batches are submitted concurrently, with at most 
+    `_max_concurrent_requests` calls to the classifier at a time 
+    across all activity calls in the worker process.
+
     Parameters
     ----------
-    input: tuple[str,str,list[dict]]
+    input: tuple[str,str,list]
         Input is a tuple of
         (language, search_term, results)
+        where results is either a single batch (`list[dict]`)
+        or a list of batches (`list[list[dict]]`)
 
     Returns
     -------
     list[dict]
         input list of results augmented with
         classification results.
+        (When given multiple batches, the results of all batches in order)
         Setting the properties:
         * `score`: The overall classification score
         * `severity`: Number indicating how much bad there is in the 
@@ -91,20 +296,7 @@ async def main(input: tuple[str,str,list[dict]]) -> list[dict]:
     """
     
     language, search_term, items = input
-    try:
-        request_data = {
-            'name': search_term,
-            'snippets': [to_classify_snippet(item) for item in items]
-        }
+    batches = items if items and isinstance(items[0], list) else [items]
 
-        classify_url = Config.get_classify_url()
-
-        async with aiohttp.ClientSession() as client:
-            async with client.post(classify_url, json=request_data) as response:
-                response.raise_for_status()
-                response_data = await response.json()
-                return [to_scored_item(item, score) for (item, score) in  zip(items, response_data['scores'])]
-
-    except Exception as e:
-        logging.exception('Error while classifying batch', exc_info=e)
-        return [to_scored_item(item, get_default_score(item, 'Classification call failed')) for item in  items]
\ No newline at end of file
+    scored_batches = await asyncio.gather(*[_classify_batch(search_term, batch) for batch in batches])
+    return [item for scored_batch in scored_batches for item in scored_batch]
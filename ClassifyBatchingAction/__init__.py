@@ -7,6 +7,41 @@ import Config
 import logging
 
 
+def _iter_batches(items: list[dict], max_batch_size: int):
+    """Lazily divides items into batches based on the byte size of their text bodies
+    
+    A batch is closed as soon as its combined size exceeds `max_batch_size`.
+    A single item larger than `max_batch_size` ends up in a batch of its own.
+
+    Parameters
+    ----------
+    items: list[dict]
+        Processed search result items with `text_body_bytes` set.
+    max_batch_size: int
+        Max combined byte size of the text bodies in a batch
+
+    Yields
+    ------
+    list[dict]
+        The next batch of items
+    """
+
+    current_batch = []
+    current_batch_length = 0
+
+    for item in items:
+        current_batch.append(item)
+        current_batch_length += item['text_body_bytes']
+        if current_batch_length > max_batch_size:
+            yield current_batch
+            current_batch = []
+            current_batch_length = 0
+
+    # yield the last unfinished batch if it has any items
+    if current_batch:
+        yield current_batch
+
+
 def main(items: list[dict]) -> list[list[dict]]:
     """Divides the incoming list of processed search result items into batches
     
@@ -23,6 +58,7 @@ def main(items: list[dict]) -> list[list[dict]]:
     ----------
     items: list[dict]
         Search result items processed to create the best possible text bodies for searching.
+        (As created by `CreateTextBodyAction`, with `text_body_bytes` set)
 
     Returns
     -------
@@ -31,23 +67,8 @@ def main(items: list[dict]) -> list[list[dict]]:
         batches. (Equally sized on data length, no number of items)
     """
     try:
-        current_batch_length = 0
-        current_batch = []
-        batches = []
         max_batch_size = Config.get_classify_batch_size() * 1000
-
-        for item in items:
-            current_batch.append(item)
-            current_batch_length = current_batch_length + len(item['text_body'].encode('utf-8'))
-            if (current_batch_length > max_batch_size):
-                batches.append(current_batch)
-                current_batch = []
-
-        # add the last unfinished batch if it has any items
-        if len(current_batch) > 0:
-            batches.append(current_batch)
-
-        return batches
+        return list(_iter_batches(items, max_batch_size))
     except Exception as e:
         logging.exception('Failed batching results for classification', exc_info=e)
         return [items]
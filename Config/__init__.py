@@ -1,8 +1,16 @@
 from opencensus.extension.azure.functions import OpenCensusExtension
 from opencensus.trace import config_integration
 from opencensus.trace.logging_exporter import LoggingExporter
+from azure.core.exceptions import ResourceExistsError
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.storage.blob.aio import BlobServiceClient, ContainerClient
+import aiohttp
+import asyncio
+import atexit
+import functools
 import logging
 import os
+import types
 
 # Set up instrumentation using OpenCensus
 # (https://docs.microsoft.com/en-us/azure/azure-monitor/app/opencensus-python)
@@ -20,6 +28,31 @@ app_insights_disabled = os.getenv('AzureFunctionsJobHost__logging__applicationIn
 if app_insights_disabled:
     OpenCensusExtension._exporter = LoggingExporter()
 
+# Shared clients, created on first use by `get_http_session()`
+# and `get_blob_service_client()` and reused by all functions 
+# executing in this worker process.
+_http_session = None
+_blob_service_client = None
+_blob_container_client = None
+_classify_cache_container_client = None
+
+# This can be configured to be a row in a table store or something else
+# that can potentially be loaded at runtime
+# but for now, we keep it in code
+_norwegian_search_string = """Hvitvasking OR Heleri OR Tyveri OR Underslag OR Ran OR Utpressing OR Bedrageri OR Skattesvik OR Korrupsjon OR "Økonomisk utroskap" OR Terrorfinansiering OR Arbeidslivskriminalitet OR Konkurskriminalitet OR Miljøkriminalitet OR Regnskapskriminalitet OR Verdipapirkriminalitet OR Fakturasvindel OR Investeringsbedrageri OR Direktørbedrageri OR Olga-svindel OR Akvakulturkriminalitet OR "2Svart arbeid" OR "Økonomisk kriminalitet" OR Pengemuldyr OR Narkotika OR Smugling OR Kokain OR Heroin OR Skatteparadis OR Afghanistan OR Barbados OR Burkina OR Faso OR Caymanøyene OR Haiti OR Filippinene OR Iran OR Jamaica OR Jemen OR Jordan OR Kambodsja OR Mali OR Marokko OR Myanmar OR Nicaragua OR Nord-Korea OR Pakistan OR Panama OR Senegal OR Syria OR Sør-Sudan OR "Trinidad og Tobago" OR Uganda OR Vanuatu OR Zimbabwe OR Albania OR Forente OR Arabiske OR Emirater OR Malta OR Tyrkia OR Yemen OR Grønnvasking OR Faunakriminalitet OR Menneskesmugling OR Anmeldt OR Ulovlig OR Kriminell OR Lønnstyveri OR Hasj OR Marihuana OR Ekstremist OR Radikal OR Overgrep OR Forsikringssvindel OR Terrorist OR Militant OR Sedelighet OR Innsidehandel OR arrestert OR krypto OR kryptovaluta OR "virtuell valuta" OR bitcoin OR ethereum"""
+_swedish_search_string = """Penningtvätt OR Häleri OR Stöld OR tjuveri OR Förskingring OR Rån OR Utpressning OR Bedrägeri OR Skattebrott OR Korruption OR terroristfinansiering OR konkursbrott OR Miljöbrott OR Bokföringsbrott OR Finansmarknadsbrott OR Fakturabedrägeri OR fordringsbedrägeri OR Investeringsbedrägeri OR VD-bedrägeri OR "Olga bedrägeri" OR Svartarbete OR "Ekonomisk brottslighet" OR ekobrott OR bulvan OR Narkotika OR Smuggling OR Kokain OR Heroin OR Skatteparadis OR Afghanistan OR Barbados OR "Burkina Faso" OR Caymanöarna OR Kajmanöarna OR Haiti OR Filippinerna OR Iran OR Jamaica OR Jemen OR Jordanien OR Kambodja OR Mali OR Marocko OR Myanmar OR Nicaragua OR Nordkorea OR Pakistan OR Panama OR Senegal OR Syrien OR Sydsudan OR "Trinidad och Tobago" OR Uganda OR Vanuatu OR Zimbabwe OR Albanien OR "Förenade arabemiraten" OR Malta OR Turkiet OR Jemen OR Greenwashing OR grönmålning OR gröntvättning OR Viltbrott OR Människosmuggling OR Anmäld OR Olagligt OR Kriminell OR Brottslig OR Lönestöld OR hasch OR marijuana OR Extremist OR Radikal OR övergrepp OR Försäkringsbedrägeri OR Terrorist OR Militant OR Sedlighet OR Insiderbrott OR arresterad OR krypto OR Kryptovaluta OR "digital valuta" OR bitcoin OR ethereum OR Cannabis OR Subventionsmissbruk OR Borgenärsbrott OR "Brott mot låneförbudet" OR  "Målvaktsbestämmelsen" OR "Skatteredovisningsbrott" OR "vårdslös skatteredovisning" OR "vårdslös skatteuppgift" OR "EU-bedrägeri" OR Marknadsmanipulation OR Marknadsmissbruk OR Omställningsstödsbrott OR "Organiserad brottslighet" OR Svindleri OR Bidragsbrott OR "Trolöshet mot huvudman" OR Urkundsförfalskning OR Kortbedräger"""
+_danish_search_string = """Hvidvaskning OR Hæleri OR Tyveri OR Underslæb OR Røveri OR Afpresning OR Bedrageri OR skattesvig OR Skatteunddragelse OR Korruption OR terrorfinansiering OR Arbejdskriminalitet OR arbejdsmiljøforbrydelser OR Konkurskriminalitet OR Konkursrytteri OR Miljøkriminalitet OR regnskabsforbrydelser OR bogføringsforbrydelser OR Værdipapirbedrageri OR fakturasvig OR investeringssvig OR Direktørsvindel OR "Sort arbejde" OR "Økonomisk kriminalitet" OR pengemuldyr OR Narkotika OR Smugleri OR Kokain OR Heroin OR Skattely OR Afghanistan OR Barbados OR "Burkina Faso" OR Caymanøerne OR Haiti OR Filippinerne OR Iran OR Jamaica OR Yemen OR Jordan OR Cambodja OR Mali OR Marokko OR Myanmar OR Nicaragua OR Nordkorea OR Pakistan OR Panama OR Senegal OR Syrien OR Sydsudan OR "Trinidad og Tobago" OR Uganda OR Vanuatu OR Zimbabwe OR Albanien OR "Forenede Arabiske Emirater" OR Malta OR Tyrkiet OR Grønvask OR grønvaskning OR faunakriminalitet OR Menneskesmugling OR Anmeldt OR Ulovligt OR Kriminel OR Løntyveri OR hamp OR marihuana OR Ekstremist OR Radikal OR Overfald OR Forsikringssvig OR Forsikringssvindel OR Terrorist OR Militant OR Sedelighet OR insiderhandel OR anholdt OR krypto OR kryptovaluta OR "virtuell valuta" OR bitcoin OR ethereum OR Skyldnersvig OR Afgiftsunddragelse OR Toldkriminalitet OR Valutakriminalitet OR Momssvig OR Kursmanipulation OR "leasing-karrusel" """
+
+_language_search_strings = {
+    'nb_no': _norwegian_search_string,
+    'sv_se': _swedish_search_string,
+    'da_dk': _danish_search_string
+}
+
+# NOTE: The settings are read from environment variables and cached
+#       for the lifetime of the worker process. (The worker process is 
+#       restarted when the application settings change)
+
 def _get_connection_string_components(connection_string:str) -> dict:
     """Splits a storage account connection string into its constituent parts
     
@@ -34,14 +67,19 @@ def _get_connection_string_components(connection_string:str) -> dict:
         Dictionary of each key / value represented by the connection string
     """
 
-    return { 
-        pair[:split_pos] : pair[split_pos+1:] 
-        for (pair, split_pos) 
-        in [(pair, pair.find('=')) for pair in connection_string.split(';')]
-    }
+    components = {}
+    for pair in connection_string.split(';'):
+        # Values (like account keys) may contain `=` themselves, 
+        # so only split on the first one
+        key, separator, value = pair.partition('=')
+        if separator:
+            components[key] = value
 
+    return components
 
-def get_configured_languages() -> dict:
+
+@functools.lru_cache(maxsize=1)
+def get_configured_languages() -> types.MappingProxyType:
     """Gets configured languages with configuration
     
     Languages are configured in several environment variables:
@@ -56,10 +94,13 @@ def get_configured_languages() -> dict:
                                   currently supported. (nb-NO;sv-SE;da-DK)
     * [language]__search_engine_id: Google search engine id for the given language.
                                    
+    The result is cached for the lifetime of the worker process,
+    and shared between all callers, so it is returned read only.
+
     Returns
     -------
-    dict
-        Dictionary of supported languages with settings as sub keys:
+    types.MappingProxyType
+        Read only dictionary of supported languages with settings as sub keys:
         {
             'nb-NO': {
                 'search_engine_id': [some value]
@@ -68,22 +109,9 @@ def get_configured_languages() -> dict:
         }
     """
 
-    # This can be configured to be a row in a table store or something else
-    # that can potentially be loaded at runtime
-    # but for now, we keep it in code
-    norwegian_search_string = """Hvitvasking OR Heleri OR Tyveri OR Underslag OR Ran OR Utpressing OR Bedrageri OR Skattesvik OR Korrupsjon OR "Økonomisk utroskap" OR Terrorfinansiering OR Arbeidslivskriminalitet OR Konkurskriminalitet OR Miljøkriminalitet OR Regnskapskriminalitet OR Verdipapirkriminalitet OR Fakturasvindel OR Investeringsbedrageri OR Direktørbedrageri OR Olga-svindel OR Akvakulturkriminalitet OR "2Svart arbeid" OR "Økonomisk kriminalitet" OR Pengemuldyr OR Narkotika OR Smugling OR Kokain OR Heroin OR Skatteparadis OR Afghanistan OR Barbados OR Burkina OR Faso OR Caymanøyene OR Haiti OR Filippinene OR Iran OR Jamaica OR Jemen OR Jordan OR Kambodsja OR Mali OR Marokko OR Myanmar OR Nicaragua OR Nord-Korea OR Pakistan OR Panama OR Senegal OR Syria OR Sør-Sudan OR "Trinidad og Tobago" OR Uganda OR Vanuatu OR Zimbabwe OR Albania OR Forente OR Arabiske OR Emirater OR Malta OR Tyrkia OR Yemen OR Grønnvasking OR Faunakriminalitet OR Menneskesmugling OR Anmeldt OR Ulovlig OR Kriminell OR Lønnstyveri OR Hasj OR Marihuana OR Ekstremist OR Radikal OR Overgrep OR Forsikringssvindel OR Terrorist OR Militant OR Sedelighet OR Innsidehandel OR arrestert OR krypto OR kryptovaluta OR "virtuell valuta" OR bitcoin OR ethereum"""
-    swedish_search_string = """Penningtvätt OR Häleri OR Stöld OR tjuveri OR Förskingring OR Rån OR Utpressning OR Bedrägeri OR Skattebrott OR Korruption OR terroristfinansiering OR konkursbrott OR Miljöbrott OR Bokföringsbrott OR Finansmarknadsbrott OR Fakturabedrägeri OR fordringsbedrägeri OR Investeringsbedrägeri OR VD-bedrägeri OR "Olga bedrägeri" OR Svartarbete OR "Ekonomisk brottslighet" OR ekobrott OR bulvan OR Narkotika OR Smuggling OR Kokain OR Heroin OR Skatteparadis OR Afghanistan OR Barbados OR "Burkina Faso" OR Caymanöarna OR Kajmanöarna OR Haiti OR Filippinerna OR Iran OR Jamaica OR Jemen OR Jordanien OR Kambodja OR Mali OR Marocko OR Myanmar OR Nicaragua OR Nordkorea OR Pakistan OR Panama OR Senegal OR Syrien OR Sydsudan OR "Trinidad och Tobago" OR Uganda OR Vanuatu OR Zimbabwe OR Albanien OR "Förenade arabemiraten" OR Malta OR Turkiet OR Jemen OR Greenwashing OR grönmålning OR gröntvättning OR Viltbrott OR Människosmuggling OR Anmäld OR Olagligt OR Kriminell OR Brottslig OR Lönestöld OR hasch OR marijuana OR Extremist OR Radikal OR övergrepp OR Försäkringsbedrägeri OR Terrorist OR Militant OR Sedlighet OR Insiderbrott OR arresterad OR krypto OR Kryptovaluta OR "digital valuta" OR bitcoin OR ethereum OR Cannabis OR Subventionsmissbruk OR Borgenärsbrott OR "Brott mot låneförbudet" OR  "Målvaktsbestämmelsen" OR "Skatteredovisningsbrott" OR "vårdslös skatteredovisning" OR "vårdslös skatteuppgift" OR "EU-bedrägeri" OR Marknadsmanipulation OR Marknadsmissbruk OR Omställningsstödsbrott OR "Organiserad brottslighet" OR Svindleri OR Bidragsbrott OR "Trolöshet mot huvudman" OR Urkundsförfalskning OR Kortbedräger"""
-    danish_search_string = """Hvidvaskning OR Hæleri OR Tyveri OR Underslæb OR Røveri OR Afpresning OR Bedrageri OR skattesvig OR Skatteunddragelse OR Korruption OR terrorfinansiering OR Arbejdskriminalitet OR arbejdsmiljøforbrydelser OR Konkurskriminalitet OR Konkursrytteri OR Miljøkriminalitet OR regnskabsforbrydelser OR bogføringsforbrydelser OR Værdipapirbedrageri OR fakturasvig OR investeringssvig OR Direktørsvindel OR "Sort arbejde" OR "Økonomisk kriminalitet" OR pengemuldyr OR Narkotika OR Smugleri OR Kokain OR Heroin OR Skattely OR Afghanistan OR Barbados OR "Burkina Faso" OR Caymanøerne OR Haiti OR Filippinerne OR Iran OR Jamaica OR Yemen OR Jordan OR Cambodja OR Mali OR Marokko OR Myanmar OR Nicaragua OR Nordkorea OR Pakistan OR Panama OR Senegal OR Syrien OR Sydsudan OR "Trinidad og Tobago" OR Uganda OR Vanuatu OR Zimbabwe OR Albanien OR "Forenede Arabiske Emirater" OR Malta OR Tyrkiet OR Grønvask OR grønvaskning OR faunakriminalitet OR Menneskesmugling OR Anmeldt OR Ulovligt OR Kriminel OR Løntyveri OR hamp OR marihuana OR Ekstremist OR Radikal OR Overfald OR Forsikringssvig OR Forsikringssvindel OR Terrorist OR Militant OR Sedelighet OR insiderhandel OR anholdt OR krypto OR kryptovaluta OR "virtuell valuta" OR bitcoin OR ethereum OR Skyldnersvig OR Afgiftsunddragelse OR Toldkriminalitet OR Valutakriminalitet OR Momssvig OR Kursmanipulation OR "leasing-karrusel" """
-
-    language_search_strings = {
-        'nb_no': norwegian_search_string,
-        'sv_se': swedish_search_string,
-        'da_dk': danish_search_string
-    }
-
     supported_languages = {}
 
-    defined_languages_settings_string = os.getenv('languages') if os.getenv('languages') else ''
+    defined_languages_settings_string = os.getenv('languages') or ''
     defined_languages_strings = defined_languages_settings_string.split(';')
 
     for language in defined_languages_strings:
@@ -93,14 +121,15 @@ def get_configured_languages() -> dict:
         language_search_engine_key = f'{language_slug}__search_engine_id'
         language_search_engine = os.getenv(language_search_engine_key)
         # Check that all settings are present
-        if language_search_engine and language_slug in language_search_strings:
-            supported_languages[language] = {
+        if language_search_engine and language_slug in _language_search_strings:
+            supported_languages[language] = types.MappingProxyType({
                 'search_engine_id': language_search_engine,
-                'search_string': language_search_strings[language_slug]
-            }
+                'search_string': _language_search_strings[language_slug]
+            })
     
-    return supported_languages
+    return types.MappingProxyType(supported_languages)
 
+@functools.lru_cache(maxsize=1)
 def get_google_api_key() -> str:
     """Gets the configured Google API key for the application
     
@@ -109,6 +138,7 @@ def get_google_api_key() -> str:
 
     return os.getenv('google_api_key')
 
+@functools.lru_cache(maxsize=1)
 def get_function_local_blob_connection_string() -> str:
     """Returns the configured function local connection string for blob storage
     
@@ -142,6 +172,7 @@ def get_function_local_blob_connection_string() -> str:
     blob_endpoint = f"{components['DefaultEndpointsProtocol']}://{components['AccountName']}.blob.{components['EndpointSuffix']}/"
     return f'{connection_string};BlobEndpoint={blob_endpoint}'
 
+@functools.lru_cache(maxsize=1)
 def get_blob_container_name() -> str:
     """Gets the name of the blob container to be used for saving downloads
     
@@ -150,6 +181,7 @@ def get_blob_container_name() -> str:
 
     return os.getenv('DownloadsContainerName')
 
+@functools.lru_cache(maxsize=1)
 def get_classify_batch_size() -> int:
     """Gets the configured max batch size for calls to the classifier in KB
     
@@ -164,6 +196,7 @@ def get_classify_batch_size() -> int:
 
     return int(os.getenv('classify_batch_size', '300'))
 
+@functools.lru_cache(maxsize=1)
 def get_classify_url() -> str:
     """Gets the url for the classification service
     
@@ -176,3 +209,247 @@ def get_classify_url() -> str:
     """
 
     return os.getenv('classify_url')
+
+@functools.lru_cache(maxsize=1)
+def get_pdf_max_pages() -> int:
+    """Gets the max number of pages to extract text from in PDF files
+    
+    Stored in the environment variable named `pdf_max_pages`
+
+    Returns
+    -------
+    int:
+        Max number of pages.
+        Defaults to 10 if not set
+    """
+
+    return int(os.getenv('pdf_max_pages', '10'))
+
+@functools.lru_cache(maxsize=1)
+def get_pdf_max_characters() -> int:
+    """Gets the max number of characters of text to extract from PDF files
+    
+    Stored in the environment variable named `pdf_max_characters`
+
+    Returns
+    -------
+    int:
+        Max number of characters.
+        Defaults to 32000 if not set
+    """
+
+    return int(os.getenv('pdf_max_characters', '32000'))
+
+@functools.lru_cache(maxsize=1)
+def get_classify_cache_container_name() -> str:
+    """Gets the name of the blob container used to cache classification results
+    
+    Stored in the environment variable named `ClassifyCacheContainerName`
+
+    NOTE:  The cached results are only valid for the classifier that made them,
+           see `get_classify_cache_version()`.
+
+    Returns
+    -------
+    str
+        Name of the blob container.
+        Defaults to `classify-cache` if not set
+    """
+
+    return os.getenv('ClassifyCacheContainerName', 'classify-cache')
+
+@functools.lru_cache(maxsize=1)
+def get_classify_cache_version() -> str:
+    """Gets the version of the classifier, used to tell cached classification results apart
+    
+    Stored in the environment variable named `classify_cache_version`
+
+    NOTE:  Change the version when the classifier (or its model) is updated,
+           so results cached from the old classifier are no longer used.
+           (Results are also kept apart by `get_classify_url()`)
+
+    Returns
+    -------
+    str
+        Classifier version.
+        Defaults to `1` if not set
+    """
+
+    return os.getenv('classify_cache_version', '1')
+
+@functools.lru_cache(maxsize=1)
+def get_max_results() -> int:
+    """Gets the max number of results to return from a search
+    
+    Stored in the environment variable named `max_results`
+
+    Returns
+    -------
+    int:
+        Max number of results.
+        None if not set, meaning all results are returned
+    """
+
+    max_results = os.getenv('max_results')
+    return int(max_results) if max_results else None
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """Gets the HTTP client session shared by all functions in the worker process
+    
+    Creating a new session per call means a new connection pool, and with it
+    a new DNS lookup and TCP/TLS handshake for every request. The shared session
+    keeps connections alive between function invocations.
+
+    NOTE:  Do NOT use the session as a context manager (`async with`), 
+           as that closes it for every other user.
+
+    Returns
+    -------
+    aiohttp.ClientSession
+        Open client session
+    """
+
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=10,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+            enable_cleanup_closed=True
+        )
+        _http_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=60, connect=10)
+        )
+
+    return _http_session
+
+async def close_http_session():
+    """Closes the shared HTTP client session if it has been opened"""
+
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+async def get_blob_service_client() -> BlobServiceClient:
+    """Gets the blob service client shared by all functions in the worker process
+    
+    The client is connected to the function local storage account
+    (see `get_function_local_blob_connection_string()`).
+    
+    It has its own HTTP connection pool, sized for parallel (ranged)
+    blob downloads, as all its requests go to the same host.
+
+    NOTE:  Do NOT use the client, or blob clients created from it, as
+           context managers (`async with`), as that closes the client
+           for every other user.
+
+    Returns
+    -------
+    BlobServiceClient
+        Blob service client for the function local storage account
+    """
+
+    global _blob_service_client
+    if _blob_service_client is None:
+        connector = aiohttp.TCPConnector(
+            limit=32,
+            limit_per_host=32,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True
+        )
+        # No session timeout, the SDK sets timeouts on each request
+        session = aiohttp.ClientSession(connector=connector)
+        _blob_service_client = BlobServiceClient.from_connection_string(
+            get_function_local_blob_connection_string(),
+            transport=AioHttpTransport(session=session, session_owner=True),
+            # Blobs are downloaded in chunks of this size
+            max_chunk_get_size=4 * 1024 * 1024
+        )
+
+    return _blob_service_client
+
+async def get_blob_container_client() -> ContainerClient:
+    """Gets the container client for the downloads container shared by all functions in the worker process
+    
+    The container is the one named by `get_blob_container_name()`,
+    the client is created from the shared blob service client.
+
+    NOTE:  Do NOT use the client, or blob clients created from it, as
+           context managers (`async with`), as that closes the client
+           for every other user.
+
+    Returns
+    -------
+    ContainerClient
+        Container client for the downloads container
+    """
+
+    global _blob_container_client
+    if _blob_container_client is None:
+        blob_service_client = await get_blob_service_client()
+        _blob_container_client = blob_service_client.get_container_client(get_blob_container_name())
+
+    return _blob_container_client
+
+async def get_classify_cache_container_client() -> ContainerClient:
+    """Gets the container client for the classification result cache shared by all functions in the worker process
+    
+    The container is the one named by `get_classify_cache_container_name()`.
+    It is created if it does not exist, once per worker process.
+
+    NOTE:  Do NOT use the client, or blob clients created from it, as
+           context managers (`async with`), as that closes the client
+           for every other user.
+
+    Returns
+    -------
+    ContainerClient
+        Container client for the classification result cache,
+        None if the container does not exist and could not be created
+        (it is attempted again on next call).
+    """
+
+    global _classify_cache_container_client
+    if _classify_cache_container_client is None:
+        blob_service_client = await get_blob_service_client()
+        container_client = blob_service_client.get_container_client(get_classify_cache_container_name())
+        try:
+            await container_client.create_container()
+        except ResourceExistsError:
+            pass
+        except Exception as e:
+            logging.warning(f'Failed to create classification cache container: {e}')
+            return None
+
+        _classify_cache_container_client = container_client
+
+    return _classify_cache_container_client
+
+async def close_blob_service_client():
+    """Closes the shared blob service client if it has been created"""
+
+    global _blob_service_client, _blob_container_client, _classify_cache_container_client
+    if _blob_service_client is not None:
+        await _blob_service_client.close()
+    _blob_service_client = None
+    _blob_container_client = None
+    _classify_cache_container_client = None
+
+async def _close_shared_clients():
+    await close_blob_service_client()
+    await close_http_session()
+
+@atexit.register
+def _close_shared_clients_on_exit():
+    """Closes the shared clients when the worker process shuts down"""
+
+    if _blob_service_client is None and (_http_session is None or _http_session.closed):
+        return
+
+    try:
+        asyncio.run(_close_shared_clients())
+    except Exception as e:
+        logging.warning(f'Failed to close shared clients on shutdown: {e}')
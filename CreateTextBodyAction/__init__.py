@@ -1,9 +1,10 @@
 """Activity function to collate gathered text into a body for classification"""
 
+import ExtractedContent
 import logging
 
 
-def main(itemMetadata: dict) -> dict:
+def create_text_body(itemMetadata: dict, extracted_content: str = None) -> dict:
     """Generates single string snippet for classification from the provided search result item
     
     Using extracted text and metadata, creates the best possible text body to submit for classification.
@@ -11,28 +12,53 @@ def main(itemMetadata: dict) -> dict:
     Parameters
     ----------
     itemMetadata: dict
-        Processed search result with extracted text and metadata
+        Processed search result with metadata
+    extracted_content: str
+        Text extracted from the content of the search result, if any
 
     Returns
     -------
     dict
         Item metadata with:
-        1. Extracted content property removed (to avoid huge items due to large amounts of text)
-        2. The property "text_body" set to the value that should be submitted to classification
+        1. The property "text_body" set to the value that should be submitted to classification
            (if something fails, the text_body will be set to the content of "snippet")
+        2. The property "text_body_bytes" set to the UTF-8 encoded byte size of "text_body"
     """
 
     try:
-        text_body = ' ... '.join(itemMetadata['snippets'])
-        if itemMetadata['extracted_content']:
-            text_body = text_body + ' ... ' + itemMetadata['extracted_content']
-        
-        itemMetadata['extracted_content'] = None
+        # Join everything in one go to avoid copying the (potentially large)
+        # extracted content into intermediate strings
+        snippets = itemMetadata['snippets']
+        if extracted_content:
+            text_body = ' ... '.join([*snippets, extracted_content])
+        else:
+            text_body = ' ... '.join(snippets)
+
         itemMetadata['text_body'] = text_body
+        itemMetadata['text_body_bytes'] = len(text_body.encode('utf-8'))
         return itemMetadata
     except Exception as e:
         logging.exception(f'Error while creating text body for {itemMetadata["id"]}', exc_info=e)
-        itemMetadata['extracted_content'] = None
         itemMetadata['text_body'] = itemMetadata['snippet']
+        itemMetadata['text_body_bytes'] = len(itemMetadata['snippet'].encode('utf-8'))
         return itemMetadata
+
+async def main(itemMetadata: dict) -> dict:
+    """Activity function generating the text body for classification of a search result item
     
+    Loads the extracted content of the item, referenced by the property
+    "extracted_content_key" (See `ExtractedContent`), and creates the text body.
+
+    See `create_text_body()`, which can be called directly 
+    when there is no extracted content to load and join.
+    """
+
+    extracted_content = None
+    try:
+        if itemMetadata.get('extracted_content_key'):
+            extracted_content = await ExtractedContent.load_extracted_content(itemMetadata['extracted_content_key'])
+    except Exception as e:
+        # The snippets are still worth classifying
+        logging.exception(f'Failed loading extracted content for {itemMetadata["id"]}', exc_info=e)
+
+    return create_text_body(itemMetadata, extracted_content)
@@ -3,12 +3,46 @@
 If the website has been downloaded before (within reasonable time), the data is not re-downloaded.
 """
 
-import aiohttp
 import Config
 import logging
 
+from aiohttp import ClientResponse
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
 from azure.storage.blob import BlobType, ContentSettings
-from azure.storage.blob.aio import BlobServiceClient
+from tempfile import SpooledTemporaryFile
+
+# Size of the chunks read from the download stream
+_stream_chunk_size = 64 * 1024
+# Downloaded content larger than this is spooled to disk instead of memory
+_max_spooled_memory_size = 4 * 1024 * 1024
+
+async def _spool_content(response: ClientResponse) -> SpooledTemporaryFile:
+    """Reads the body of a response into a temporary file
+    
+    The blob storage SDK reads upload data synchronously, so it can not 
+    read from the response stream directly. The temporary file is kept
+    in memory, unless the content is large.
+
+    Parameters
+    ----------
+    response: aiohttp.ClientResponse
+        Response to read the body of
+
+    Returns
+    -------
+    SpooledTemporaryFile
+        File with the body, positioned at the end.
+        Must be closed by the caller.
+    """
+
+    content = SpooledTemporaryFile(max_size=_max_spooled_memory_size)
+    try:
+        async for chunk in response.content.iter_chunked(_stream_chunk_size):
+            content.write(chunk)
+        return content
+    except Exception:
+        content.close()
+        raise
 
 async def main(itemMetadata: dict) -> str:
     """Action function that downloads the content of a url and saves it to blob storage
@@ -34,40 +68,59 @@ async def main(itemMetadata: dict) -> str:
     """
 
     try:
-        async with BlobServiceClient.from_connection_string(Config.get_function_local_blob_connection_string()) as blob_service_client:
-            async with blob_service_client.get_blob_client(container = Config.get_blob_container_name(), blob = itemMetadata['id']) as blob_client:
-                # Do not do anything else if the blob already exists
-                if await blob_client.exists():
-                    blob_properties = await blob_client.get_blob_properties()
-
-                    blob_metadata = {
-                        'blob_key': itemMetadata['id'],
-                        'content_type': blob_properties.content_settings.content_type
-                    }
-
-                    itemMetadata['downloaded_content'] = blob_metadata
-                    return itemMetadata
-                
-                async with aiohttp.ClientSession() as client:
-                    async with client.get(itemMetadata['link']) as response:
-                        response.raise_for_status()
-                        await blob_client.upload_blob(
-                            data=await response.read(),
-                            blob_type=BlobType.BLOCKBLOB,
-                            length=response.content_length,
-                            overwrite=True,
-                            content_settings=ContentSettings(
-                                content_type=response.content_type
-                            )
+        container_client = await Config.get_blob_container_client()
+        blob_client = container_client.get_blob_client(itemMetadata['id'])
+        # Do not do anything else if the blob already exists
+        # (Reading the properties directly saves a round trip compared to
+        # checking existence first, a missing blob raises ResourceNotFoundError)
+        try:
+            blob_properties = await blob_client.get_blob_properties()
+
+            blob_metadata = {
+                'blob_key': itemMetadata['id'],
+                'content_type': blob_properties.content_settings.content_type
+            }
+
+            itemMetadata['downloaded_content'] = blob_metadata
+            return itemMetadata
+        except ResourceNotFoundError:
+            pass
+
+        client = await Config.get_http_session()
+        async with client.get(itemMetadata['link']) as response:
+            response.raise_for_status()
+            # The body is spooled to a temporary file instead of being read 
+            # into memory, whether the server sent Content-Length or used 
+            # chunked transfer encoding.
+            with await _spool_content(response) as content:
+                # Content-Length (if sent) is the size of the (possibly compressed)
+                # transferred body, not of the content we got
+                length = content.tell()
+                content.seek(0)
+
+                # Not overwriting makes the upload fail if the blob has been created
+                # since we checked, typically by a download of the same url from 
+                # another search. That blob is as good as ours.
+                try:
+                    await blob_client.upload_blob(
+                        data=content,
+                        blob_type=BlobType.BLOCKBLOB,
+                        length=length,
+                        max_concurrency=1,
+                        content_settings=ContentSettings(
+                            content_type=response.content_type
                         )
+                    )
+                except ResourceExistsError:
+                    pass
 
-                        blob_metadata = {
-                            'blob_key': itemMetadata['id'],
-                            'content_type': response.content_type
-                        }
+            blob_metadata = {
+                'blob_key': itemMetadata['id'],
+                'content_type': response.content_type
+            }
 
-                        itemMetadata['downloaded_content'] = blob_metadata
-                        return itemMetadata
+            itemMetadata['downloaded_content'] = blob_metadata
+            return itemMetadata
 
     except Exception as e:
         logging.exception(f'Failed to download content from {itemMetadata["link"]}', exc_info=e)
@@ -0,0 +1,115 @@
+"""Functions for storing extracted content in blob storage
+
+Extracted content can be hundreds of KB of text. Activity inputs and outputs
+are stored in the orchestration history, and spill to blob storage anyway 
+when larger than 64KB. So the extraction activities store the text in blob 
+storage, next to the downloaded content, and only the key of the blob is
+passed between activities.
+"""
+
+import Config
+
+from azure.storage.blob import ContentSettings
+
+# Extracted content is stored as UTF-8 text, named by the key of the
+# downloaded content it was extracted from and the version of the extraction
+_extracted_content_suffix = '.txt'
+_extracted_content_type = 'text/plain; charset=utf-8'
+
+def get_extracted_content_key(blob_key: str, extraction_version: str) -> str:
+    """Gets the key of the extracted content blob for downloaded content
+    
+    Parameters
+    ----------
+    blob_key: str
+        Key of the downloaded content
+    extraction_version: str
+        Identifies how the content is extracted (extractor and its settings).
+        Content extracted in another way is not reused.
+
+    Returns
+    -------
+    str
+        Key of the extracted content blob
+    """
+
+    return f'{blob_key}.{extraction_version}{_extracted_content_suffix}'
+
+async def find_extracted_content(blob_key: str, extraction_version: str) -> str:
+    """Finds content previously extracted from downloaded content
+    
+    Parameters
+    ----------
+    blob_key: str
+        Key of the downloaded content
+    extraction_version: str
+        Identifies how the content is extracted, see `get_extracted_content_key()`
+
+    Returns
+    -------
+    str
+        Key of the blob with the extracted content,
+        None if no content has been saved for the downloaded content
+    """
+
+    extracted_content_key = get_extracted_content_key(blob_key, extraction_version)
+    container_client = await Config.get_blob_container_client()
+    if await container_client.get_blob_client(extracted_content_key).exists():
+        return extracted_content_key
+
+    return None
+
+async def save_extracted_content(blob_key: str, extraction_version: str, extracted_content: str) -> str:
+    """Saves content extracted from downloaded content
+    
+    Parameters
+    ----------
+    blob_key: str
+        Key of the downloaded content the text was extracted from
+    extraction_version: str
+        Identifies how the content is extracted, see `get_extracted_content_key()`
+    extracted_content: str
+        Extracted text, or None if no text was extracted
+
+    Returns
+    -------
+    str
+        Key of the blob with the extracted content,
+        None if no text was extracted
+    """
+
+    if not extracted_content:
+        return None
+
+    extracted_content_key = get_extracted_content_key(blob_key, extraction_version)
+    container_client = await Config.get_blob_container_client()
+    # Extracting the same content again gives the same text,
+    # so overwriting an existing blob is fine
+    await container_client.upload_blob(
+        extracted_content_key,
+        extracted_content.encode('utf-8'),
+        overwrite=True,
+        content_settings=ContentSettings(
+            content_type=_extracted_content_type
+        )
+    )
+
+    return extracted_content_key
+
+async def load_extracted_content(extracted_content_key: str) -> str:
+    """Loads extracted content saved by `save_extracted_content()`
+    
+    Parameters
+    ----------
+    extracted_content_key: str
+        Key of the blob with the extracted content
+
+    Returns
+    -------
+    str
+        The extracted text
+    """
+
+    container_client = await Config.get_blob_container_client()
+    blob_downloader = await container_client.download_blob(extracted_content_key)
+    return (await blob_downloader.readall()).decode('utf-8')
@@ -1,8 +1,27 @@
 """Functions for working with the metadata part of the Google search results"""
 
+from datetime import datetime
 from dateutil import parser
+import hashlib
 import logging
-from urllib.parse import quote
+
+# Prefix of ids made by `_make_id()`. Must be changed if the id format changes.
+# (v1 was the url quoted link, without prefix)
+_id_prefix = 'v2_'
+
+# Pagemap keys that may contain images, in order of preference
+_image_keys = ('cse_thumbnail', 'cse_image')
+# (Compared case insensitive)
+_image_url_prefixes = ('http://', 'https://')
+
+# Metadata values indicating that text can not be extracted from the source
+_hard_paywall = 'hard'
+_cxense_subscriber_access = 'subscriber'
+# (og:type is `video` or one of the `video.*` types)
+_video_type_prefix = 'video'
+
+# Metadata keys that may contain the creation date of an article
+_date_keys = ('article:published_time', 'dc.date.issued', 'article:modified_time')
 
 def _get_metadata_dictionary(item:dict) -> dict:
     """Returns the dictionary of metadata from a Google result item if available
@@ -29,113 +48,6 @@ def _get_metadata_dictionary(item:dict) -> dict:
         logging.exception("Error while attempting to extract metadata from item", exc_info=e)
         return {}
 
-def _get_titles(item : dict, metadata: dict) -> list[str]:
-    """Attempts to get the best possible titles for an item
-    
-    Some times more accurate titles are provided in the metadata
-    from google.
-    
-    This function attempts to find them all and create a collection of them.
-
-    Parameters
-    ----------
-    item: dict
-        Raw search result item from Google
-    
-    metadata: dict
-        Extracted metadata from the raw result item
-
-    Returns
-    list[str]
-        List of titles found in the metadata 
-        in addition to the always present title
-        from the raw item.
-    """
-
-    titles = []
-    titles.append(item['title'])
-
-    if metadata and type(metadata) is dict:
-        if 'og:title' in metadata:
-            titles.append(metadata['og:title'])
-        
-        if 'twitter:title' in metadata:
-            titles.append(metadata['twitter:title'])
-
-        if 'title' in metadata:
-            titles.append(metadata['title'])
-
-    return titles
-
-def _get_snippets(item:dict, metadata:dict) -> list[str]:
-    """Extracts any text that may be used as snippets
-    
-    Some times there are longer more cohesive text snippets in
-    the Google metadata than the default snippet
-    
-    This functions attempts to get all of them as a list
-    
-    Parameters
-    ----------
-    item: dict
-        Raw search result item from Google
-    
-    metadata: dict
-        Extracted metadata from the raw result item
-
-    Returns
-    list[str]
-        List of snippets / descriptions found in the metadata 
-        in addition to the always present text snippet
-        from the raw item.
-    """
-
-    snippets = []
-    snippets.append(item['snippet'])
-
-    if (metadata and type(metadata) is dict):
-        if 'og:description' in metadata:
-            snippets.append(metadata['og:description'])
-
-        if 'twitter:description' in metadata:
-            snippets.append(metadata['twitter:description'])
-    
-    return snippets
-
-def _text_extraction_possible(item:dict, metadata:dict) -> bool:
-    """Attemtps to determine if it is possible to extract text from the source of the search result
-    
-    Parameters
-    ----------
-    item: dict
-        Raw search result item from Google
-    
-    metadata: dict
-        Extracted metadata from the raw result item
-
-    Returns
-    -------
-    bool
-        `False` if the source is either believed to be behind a paywall
-        or if metadata indicates the source is a video
-    """
-
-    # If no metadata is available
-    # assume text extraction is possible
-    if (not metadata) or (not (type(metadata) is dict)):
-        return True
-
-    if 'lp:paywall' in metadata and metadata['lp:paywall'] == 'hard':
-        return False
-
-    if 'cxenseparse:nvl-smp-access' in metadata and metadata['cxenseparse:nvl-smp-access'] == 'subscriber':
-        return False
-
-    if 'og:type' in metadata and 'video' in metadata['og:type'].lower():
-        return False
-
-    return True
-
 def _get_image(item:dict) -> str:
     """Attempts to get a usable image thumbnail url from the search result item
 
@@ -153,23 +65,18 @@ def _get_image(item:dict) -> str:
     """
 
     # Image data is always in the pagemap part
-    if not 'pagemap' in item:
+    pagemap = item.get('pagemap')
+    if not pagemap:
         return None
 
-    if 'cse_thumbnail' in item['pagemap']:
-        if len(item['pagemap']['cse_thumbnail']) > 0 and 'src' in item['pagemap']['cse_thumbnail'][0]:
-            possible_image = item['pagemap']['cse_thumbnail'][0]['src']
-
-            if possible_image.lower().startswith('http'):
+    # Thumbnails are preferred over full size images
+    for image_key in _image_keys:
+        images = pagemap.get(image_key)
+        if images:
+            possible_image = images[0].get('src')
+            if possible_image and possible_image[:8].lower().startswith(_image_url_prefixes):
                 return possible_image
 
-    if 'cse_image' in item['pagemap']:
-        if len(item['pagemap']['cse_image']) > 0 and 'src' in item['pagemap']['cse_image'][0]:
-            possible_image = item['pagemap']['cse_image'][0]['src']
-
-            if possible_image.lower().startswith('http'):
-                return possible_image
-    
     return None
 
 def _get_date(item:dict, metadata:dict) -> str:
@@ -191,29 +98,35 @@ def _get_date(item:dict, metadata:dict) -> str:
     """
 
     # No metadata no date
-    if (not metadata or not (type(metadata) is dict)):
-        None
-
-    def _get_if_date(key):
-        if key in metadata:
-            possible_date = metadata[key]
-            try:
-                return parser.parse(possible_date)
-            except Exception as e:
-                return None
-
-    date_keys = ['article:published_time', 'dc.date.issued', 'article:modified_time']
-    possible_dates = [_get_if_date(possible_date) for possible_date in date_keys]
-    found_dates = [found_date.isoformat() for found_date in possible_dates if found_date]
-    if (len(found_dates) > 0):
-        return found_dates[0]
-    
+    if not metadata:
+        return None
+
+    # Keys in order of preference, the first one that can be parsed is used
+    for key in _date_keys:
+        possible_date = metadata.get(key)
+        if not possible_date:
+            continue
+
+        # Most dates are ISO 8601 formatted, which is a lot faster
+        # to parse than trying all the formats known to dateutil
+        try:
+            return datetime.fromisoformat(possible_date.replace('Z', '+00:00')).isoformat()
+        except (AttributeError, ValueError):
+            pass
+
+        try:
+            return parser.parse(possible_date).isoformat()
+        except Exception:
+            continue
+
     return None
 
 def _make_id(item:dict) -> str:
     """Attempts to make a reproducible string that can be used as an identifier of this exact search result
     
-    Used for example as cache key
+    Used for example as cache key (blob name of downloaded content).
+    The id is a fixed length hash of the link (without scheme), 
+    prefixed with the version of the id format.
     
     Parameters
     ----------
@@ -226,7 +139,8 @@ def _make_id(item:dict) -> str:
         Id string
     """
 
-    return quote(item['link'].replace('http://', '').replace('https://', ''))
+    link = item['link'].replace('http://', '').replace('https://', '')
+    return _id_prefix + hashlib.blake2b(link.encode('utf-8'), digest_size=16).hexdigest()
 
 
 def get_metadata_for_item(item:dict) -> dict:
@@ -253,17 +167,53 @@ def get_metadata_for_item(item:dict) -> dict:
             'id': 'string ident' # String identifier we can use for referring to this result itemn later.
         }
     """
+
     raw_metadata = _get_metadata_dictionary(item)
 
+    # All values needed from the metadata are looked up in one go.
+    # Some times more accurate titles and longer, more cohesive, snippets
+    # are provided in the metadata than in the search result itself.
+    og_title = raw_metadata.get('og:title')
+    twitter_title = raw_metadata.get('twitter:title')
+    meta_title = raw_metadata.get('title')
+    og_description = raw_metadata.get('og:description')
+    twitter_description = raw_metadata.get('twitter:description')
+    paywall = raw_metadata.get('lp:paywall')
+    cxense_access = raw_metadata.get('cxenseparse:nvl-smp-access')
+    og_type = raw_metadata.get('og:type')
+
+    titles = [item['title']]
+    if og_title is not None:
+        titles.append(og_title)
+    if twitter_title is not None:
+        titles.append(twitter_title)
+    if meta_title is not None:
+        titles.append(meta_title)
+
+    snippets = [item['snippet']]
+    if og_description is not None:
+        snippets.append(og_description)
+    if twitter_description is not None:
+        snippets.append(twitter_description)
+
+    # Text extraction is assumed possible unless the source is 
+    # believed to be behind a paywall or the metadata indicates 
+    # the source is a video
+    text_extraction_possible = not (
+        paywall == _hard_paywall
+        or cxense_access == _cxense_subscriber_access
+        or (og_type and og_type.lower().startswith(_video_type_prefix))
+    )
+
     return {
         'title': item['title'],
-        'titles': _get_titles(item, raw_metadata),
+        'titles': titles,
         'snippet': item['snippet'],
         'html_snippet': item['htmlSnippet'],
-        'snippets': _get_snippets(item, raw_metadata),
+        'snippets': snippets,
         'link': item['link'],
-        'text_extraction_possible': _text_extraction_possible(item, raw_metadata),
+        'text_extraction_possible': text_extraction_possible,
         'image': _get_image(item),
         'date': _get_date(item, raw_metadata),
         'id': _make_id(item)
-    }
\ No newline at end of file
+    }
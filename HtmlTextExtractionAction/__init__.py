@@ -1,43 +1,55 @@
 """Activity function to extract text from HTML pages"""
 
 import Config
+import ExtractedContent
 import logging
 
-from azure.storage.blob.aio import BlobServiceClient
+from importlib import metadata
 from trafilatura import extract
 
-async def main(itemMetadata: dict) -> dict:
-    """Extracts text from the downloaded html file represented by the metadata
+# Identifies how content is extracted (see `ExtractedContent`).
+# Bump the revision when the extraction changes, content extracted by
+# another revision or trafilatura version is then extracted again.
+_extraction_version = f'html1-trafilatura{metadata.version("trafilatura")}'
+
+async def main(downloadedContent: dict) -> str:
+    """Extracts text from the downloaded html file
     
     Parameters
     ----------
-    itemMetadata: dict
-        Meta data for the search result item to extract text from
-        needs to have the "downloaded_content" property set.
+    downloadedContent: dict
+        The downloaded content to extract text from:
+        {
+            'id': id of the search result item,
+            'blob_key': key of the downloaded content blob,
+            'content_type': content type as returned by the server,
+            'url': url the content was downloaded from
+        }
 
     Returns
     -------
-    dict
-        The Item metadata with teh property "extracted_content" set to
-        a string of extracted content.
+    str
+        Key of the blob with the extracted content (See `ExtractedContent`),
+        None if no content was extracted.
     """
 
     try:
-        async with BlobServiceClient.from_connection_string(Config.get_function_local_blob_connection_string()) as blob_service_client:
-            async with blob_service_client.get_blob_client(container = Config.get_blob_container_name(), blob = itemMetadata['downloaded_content']['blob_key']) as blob_client:
-                # Do not do anything else if the blob already exists
-                if await blob_client.exists():
-                    blob_downloader = await blob_client.download_blob()
-                    blob_content = await blob_downloader.readall()
-                    extracted = extract(blob_content)
-                    itemMetadata['extracted_content'] = extracted
-                else:
-                    itemMetadata['extracted_content'] = None
-
-                return itemMetadata
+        # Content extracted before (by any worker) is not extracted again
+        extracted_content_key = await ExtractedContent.find_extracted_content(downloadedContent['blob_key'], _extraction_version)
+        if extracted_content_key is not None:
+            return extracted_content_key
+
+        container_client = await Config.get_blob_container_client()
+        blob_client = container_client.get_blob_client(downloadedContent['blob_key'])
+        # Do not do anything else if the blob already exists
+        if await blob_client.exists():
+            blob_downloader = await blob_client.download_blob()
+            blob_content = await blob_downloader.readall()
+            extracted = extract(blob_content)
+            return await ExtractedContent.save_extracted_content(downloadedContent['blob_key'], _extraction_version, extracted)
+
+        return None
 
     except Exception as e:
-        logging.exception(f'Failed extracting content from {itemMetadata["id"]}', exc_info=e)
-        itemMetadata['extracted_content'] = None
-        return itemMetadata
-    
+        logging.exception(f'Failed extracting content from {downloadedContent["url"]}', exc_info=e)
+        return None
@@ -5,10 +5,17 @@ Called once for each language from the main orchestrator
 
 import logging
 import json
+from itertools import chain
 
 import azure.functions as func
 import azure.durable_functions as df
 
+# Number of search results processed by each `OrchestrateTextExtractionBatch`
+_text_extraction_batch_size = 10
+
+# Number of classification batches submitted by each call to `ClassifyAction`
+_batches_per_classify_call = 4
+
 
 def orchestrator_function(context: df.DurableOrchestrationContext):
     """Orchestrates an adverse media search for one language.
@@ -26,14 +33,26 @@ def orchestrator_function(context: df.DurableOrchestrationContext):
     language, search_term, depth = context.get_input()
 
     search_results = yield context.call_activity('SearchAction', (language, search_term, depth))
-    processing_tasks = [context.call_sub_orchestrator('OrchestrateTextExtraction', search_result) for search_result in search_results]
+    # No hits is a normal result. (`task_all` of no tasks gives None, not an empty list)
+    if not search_results:
+        return []
+
+    # Text is extracted in batches to keep the orchestration history short
+    search_result_batches = [search_results[i:i + _text_extraction_batch_size] for i in range(0, len(search_results), _text_extraction_batch_size)]
+    processing_tasks = [context.call_sub_orchestrator('OrchestrateTextExtractionBatch', search_result_batch) for search_result_batch in search_result_batches]
     processing_results = yield context.task_all(processing_tasks)
+    processing_results = list(chain.from_iterable(processing_results))
     
     batches = yield context.call_activity('ClassifyBatchingAction', processing_results)
 
-    scoring_tasks = [context.call_activity('ClassifyAction', (language, search_term, batch)) for batch in batches]
+    # Several batches are classified concurrently by each activity call
+    batch_groups = [batches[i:i + _batches_per_classify_call] for i in range(0, len(batches), _batches_per_classify_call)]
+    if not batch_groups:
+        return []
+
+    scoring_tasks = [context.call_activity('ClassifyAction', (language, search_term, batch_group)) for batch_group in batch_groups]
     scoring_results = yield context.task_all(scoring_tasks)
    
-    return [scoring_result for scoring_result_batch in scoring_results for scoring_result in scoring_result_batch]
+    return list(chain.from_iterable(scoring_results))
 
 main = df.Orchestrator.create(orchestrator_function)
\ No newline at end of file
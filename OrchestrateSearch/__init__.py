@@ -5,12 +5,17 @@ the sub processes involved in running an
 adverse media search
 """
 import Config
+import heapq
 import logging
 import json
+import operator
+from itertools import chain
 
 import azure.functions as func
 import azure.durable_functions as df
 
+# Sort key for results, created once instead of on every replay
+_score_key = operator.itemgetter('score')
 
 def orchestrator_function(context: df.DurableOrchestrationContext):
     """Orchestrator handling the outer orchestration of an adverse media lookup
@@ -40,7 +45,8 @@ def orchestrator_function(context: df.DurableOrchestrationContext):
     -------
     list[dict]
         Sorted results based on search engine ranking
-        + classification results
+        + classification results.
+        Limited to the highest scoring results if `max_results` is configured
     """
 
     languages = Config.get_configured_languages()
@@ -49,12 +55,25 @@ def orchestrator_function(context: df.DurableOrchestrationContext):
         return []
 
     search_term, depth, selected_languages = context.get_input()
-    # TODO: Log warning if any selected languages is not configured
 
-    searches = [context.call_sub_orchestrator('OrchestrateLanguageSearch', (language, search_term, depth)) for language in selected_languages if language in languages]
+    active_languages = [language for language in selected_languages if language in languages]
+    if len(active_languages) < len(selected_languages) and not context.is_replaying:
+        skipped_languages = [language for language in selected_languages if language not in languages]
+        logging.warning(f'Skipping languages that are not configured: {skipped_languages}')
+
+    # (`task_all` of no tasks gives None, not an empty list)
+    if not active_languages:
+        return []
+
+    searches = [context.call_sub_orchestrator('OrchestrateLanguageSearch', (language, search_term, depth)) for language in active_languages]
     search_results = yield context.task_all(searches)
-    search_results = [search_result for language_search_results in search_results for search_result in language_search_results]
-    search_results.sort(key=lambda r: r['score'], reverse=True)
+    max_results = Config.get_max_results()
+    if max_results:
+        # Only the top results are needed, no need to sort all of them
+        return heapq.nlargest(max_results, chain.from_iterable(search_results), key=_score_key)
+
+    search_results = list(chain.from_iterable(search_results))
+    search_results.sort(key=_score_key, reverse=True)
     return search_results
 
 main = df.Orchestrator.create(orchestrator_function)
\ No newline at end of file
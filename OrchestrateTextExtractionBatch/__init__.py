@@ -0,0 +1,129 @@
+"""Orchestrates the process of extracting article text from a batch of search result urls
+
+Target is to end up with the best possible context for classification.
+
+Every step is executed for all items of the batch at once, instead of 
+running one sub orchestration per search result. This keeps the 
+orchestration history, and with it the replay time, a lot shorter.
+"""
+
+import logging
+import GoogleMetadata
+from CreateTextBodyAction import create_text_body
+import azure.functions as func
+import azure.durable_functions as df
+
+# Content types of downloaded content that is extracted as PDF.
+# (Content types are stored as returned by aiohttp, lower case without parameters)
+_pdf_content_types = ('application/pdf', 'application/x-pdf')
+
+def _call_activities(context: df.DurableOrchestrationContext, calls: list[tuple[int,str,object]]):
+    """Calls activities for items in the batch concurrently
+    
+    Must be called with `yield from`.
+
+    Parameters
+    ----------
+    context: df.DurableOrchestrationContext
+        Orchestration context
+    calls: list[tuple[int,str,object]]
+        Activities to call as tuples of
+        (item index, activity name, activity input)
+
+    Returns
+    -------
+    list[tuple[int,object]]
+        Results of the activity calls as tuples of
+        (item index, activity result)
+    """
+
+    # No need to wait for nothing
+    if not calls:
+        return []
+
+    tasks = [context.call_activity(activity_name, activity_input) for (_, activity_name, activity_input) in calls]
+    results = yield context.task_all(tasks)
+    return [(index, result) for ((index, _, _), result) in zip(calls, results)]
+
+def orchestrator_function(context: df.DurableOrchestrationContext):
+    """"Orchestrates getting text representation from a batch of search results
+    
+    Will do the following steps for all items in the batch:
+    1. Extract metadata from the search result. This will be used
+       to create better context in case no further text can be extracted.
+       It is also used to determine whether the URL is pointing to a resource
+       that is unavailable for example due to paywall
+    2. Download the content if NOT behind paywall
+    3. Determine content type to determine what process to run for
+       content extraction.
+    3. For PDF, extract the content from PDF.
+    4. For Html, extract the content from HTML.
+       Extracted text is stored in blob storage, and only its key is
+       passed on to the next step.
+    5. Puts together metadata and extracted text to form the snippet to classify
+
+    Parameters
+    ----------
+    context: df.DurableOrchestrationContext
+        Input must be a list of item dictionaries from the 
+        google search
+
+    Returns
+    -------
+    list[dict]
+        Processed items, in the same order as the input
+    """
+
+    item_results = context.get_input()
+
+    items_metadata = [GoogleMetadata.get_metadata_for_item(item_result) for item_result in item_results]
+
+    downloads = []
+    for (index, item_metadata) in enumerate(items_metadata):
+        if item_metadata['text_extraction_possible']:
+            downloads.append((index, 'DownloadAction', item_metadata))
+        else:
+            item_metadata['downloaded_content'] = None
+
+    for (index, result) in (yield from _call_activities(context, downloads)):
+        items_metadata[index] = result
+
+    # Extraction activities only get what they need to find the downloaded
+    # content, and store the extracted text in blob storage. This keeps 
+    # activity inputs and outputs small enough to not spill to blob storage.
+    extractions = []
+    for (index, item_metadata) in enumerate(items_metadata):
+        item_metadata['extracted_content_key'] = None
+        downloaded_content = item_metadata['downloaded_content']
+        if downloaded_content:
+            content_type = downloaded_content['content_type'] or ''
+            if content_type.startswith(_pdf_content_types):
+                activity_name = 'PdfTextExtractionAction'
+            else:
+                activity_name = 'HtmlTextExtractionAction'
+
+            extractions.append((index, activity_name, {
+                'id': item_metadata['id'],
+                'blob_key': downloaded_content['blob_key'],
+                'content_type': downloaded_content['content_type'],
+                'url': item_metadata['link']
+            }))
+
+    for (index, extracted_content_key) in (yield from _call_activities(context, extractions)):
+        items_metadata[index]['extracted_content_key'] = extracted_content_key
+
+    # Without extracted content, creating the text body is a trivial join 
+    # of snippets that is cheaper to do here than in an activity
+    text_body_creations = []
+    for (index, item_metadata) in enumerate(items_metadata):
+        if item_metadata['extracted_content_key']:
+            text_body_creations.append((index, 'CreateTextBodyAction', item_metadata))
+        else:
+            items_metadata[index] = create_text_body(item_metadata)
+
+    for (index, result) in (yield from _call_activities(context, text_body_creations)):
+        items_metadata[index] = result
+
+    return items_metadata
+    
+main = df.Orchestrator.create(orchestrator_function)
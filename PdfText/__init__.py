@@ -0,0 +1,50 @@
+"""Text extraction from PDF files
+
+Run in separate processes by `PdfTextExtractionAction`. Only imports 
+pypdfium2, as the module is imported by every extraction process.
+"""
+
+import pypdfium2 as pdfium
+
+def extract_text(pdf_path: str, max_pages: int, max_characters: int) -> str:
+    """Extracts the text of the first pages of a PDF file
+    
+    Classification only needs the beginning of a document, so extraction
+    stops after `max_pages` pages or once `max_characters` characters
+    have been extracted, whichever comes first.
+
+    Parameters
+    ----------
+    pdf_path: str
+        Path of the PDF file
+    max_pages: int
+        Max number of pages to extract text from
+    max_characters: int
+        Max number of characters of text to extract
+
+    Returns
+    -------
+    str
+        Text of the pages, separated by new lines,
+        truncated to `max_characters`
+    """
+
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        page_texts = []
+        extracted_characters = 0
+        for index in range(min(len(pdf), max_pages)):
+            page = pdf.get_page(index)
+            text_page = page.get_textpage()
+            page_text = text_page.get_text_range()
+            text_page.close()
+            page.close()
+
+            page_texts.append(page_text)
+            extracted_characters += len(page_text) + 1
+            if extracted_characters >= max_characters:
+                break
+
+        return '\n'.join(page_texts)[:max_characters]
+    finally:
+        pdf.close()
@@ -1,44 +1,222 @@
 """Activity function to extract text from downloaded PDF files"""
 
+import asyncio
 import Config
+import ExtractedContent
+import functools
 import logging
+import multiprocessing
+import os
+import PdfText
 
-from azure.storage.blob.aio import BlobServiceClient
-from io import BytesIO
-from pdfminer.high_level import extract_text
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from importlib import metadata
+from tempfile import TemporaryDirectory
 
+# Max number of parallel requests when downloading a PDF
+_max_download_concurrency = 8
 
-async def main(itemMetadata: dict) -> dict:
-    """Extracts text from the downloaded PDF file represented by the metadata
+# Text extraction is CPU bound and is run in a pool of separate processes.
+# This uses the other cores of the VM and keeps the worker process (and 
+# its event loop) responsive, even if an extraction crashes or runs out of memory.
+# (The extraction lives in `PdfText`, so the processes do not import this
+# module, and with it `Config` and the function instrumentation)
+# Created on first use by `_get_pdf_pool()`.
+_pdf_pool_size = 2
+_pdf_pool = None
+
+# Keys of recently saved extracted content by blob key, least recently used first.
+# (The extracted text itself is stored in blob storage, see `ExtractedContent`)
+_cached_keys = OrderedDict()
+_max_cached_keys = 4096
+
+# Extractions in progress by blob key
+_pending_extractions = {}
+
+
+@functools.lru_cache(maxsize=1)
+def _get_extraction_version() -> str:
+    """Identifies how content is extracted (see `ExtractedContent`)
+    
+    Bump the revision when the extraction changes. Content extracted by
+    another revision, pypdfium2 version or page / character limits
+    is then extracted again.
+    """
+
+    return (
+        f'pdf1-pypdfium{metadata.version("pypdfium2")}'
+        f'-{Config.get_pdf_max_pages()}p-{Config.get_pdf_max_characters()}c'
+    )
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """Gets the process pool used for text extraction
+    
+    Processes are spawned rather than forked, as forking the 
+    multi threaded worker process is not safe.
+    """
+
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=_pdf_pool_size,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    return _pdf_pool
+
+def _discard_pdf_pool(pdf_pool: ProcessPoolExecutor):
+    """Discards a process pool after an extraction process died
+    
+    A broken pool can not be used again, a new one is created on next use.
+    """
+
+    global _pdf_pool
+    pdf_pool.shutdown(wait=False)
+    # Another failed extraction may already have replaced it
+    if _pdf_pool is pdf_pool:
+        _pdf_pool = None
+
+async def _extract_blob_text(blob_key: str) -> str:
+    """Downloads a PDF file from blob storage and extracts its text
+    
+    Parameters
+    ----------
+    blob_key: str
+        Key of the blob in the downloads container
+
+    Returns
+    -------
+    str
+        Extracted text, None if the blob does not exist
+    """
+
+    container_client = await Config.get_blob_container_client()
+    blob_client = container_client.get_blob_client(blob_key)
+    # Nothing to extract if the blob does not exist
+    if not await blob_client.exists():
+        return None
+
+    # Large PDFs are downloaded as parallel ranged requests
+    blob_downloader = await blob_client.download_blob(max_concurrency=_max_download_concurrency)
+    # The PDF is passed to the extraction process as a file,
+    # to avoid holding and copying it in memory
+    with TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.join(temp_dir, 'content.pdf')
+        with open(pdf_path, 'wb') as pdf_file:
+            await blob_downloader.readinto(pdf_file)
+
+        loop = asyncio.get_running_loop()
+        pdf_pool = _get_pdf_pool()
+        try:
+            return await loop.run_in_executor(
+                pdf_pool, 
+                PdfText.extract_text, 
+                pdf_path, 
+                Config.get_pdf_max_pages(), 
+                Config.get_pdf_max_characters()
+            )
+        except BrokenProcessPool:
+            _discard_pdf_pool(pdf_pool)
+            raise
+
+def _cache_key(blob_key: str, extracted_content_key: str):
+    """Adds a saved extracted content key to the cache, evicting the least recently used keys when full"""
+
+    _cached_keys[blob_key] = extracted_content_key
+    if len(_cached_keys) > _max_cached_keys:
+        _cached_keys.popitem(last=False)
+
+async def _extract_and_save(blob_key: str) -> str:
+    """Extracts the text of a downloaded PDF file and saves it, unless saved before
+
+    Parameters
+    ----------
+    blob_key: str
+        Key of the blob in the downloads container
+
+    Returns
+    -------
+    str
+        Key of the blob with the extracted content,
+        None if no content was extracted
+    """
+
+    # Content extracted before (by any worker) is not extracted again
+    extracted_content_key = await ExtractedContent.find_extracted_content(blob_key, _get_extraction_version())
+    if extracted_content_key is None:
+        extracted = await _extract_blob_text(blob_key)
+        extracted_content_key = await ExtractedContent.save_extracted_content(blob_key, _get_extraction_version(), extracted)
+
+    return extracted_content_key
+
+async def _get_extracted_content_key(blob_key: str) -> str:
+    """Gets the key of the extracted content of a downloaded PDF file
+    
+    The same url is often found by several language searches.
+    Keys of saved extracted content are cached in memory, and if the blob is
+    already being extracted, that extraction is awaited instead of 
+    starting another one.
+
+    Parameters
+    ----------
+    blob_key: str
+        Key of the blob in the downloads container
+
+    Returns
+    -------
+    str
+        Key of the blob with the extracted content, None if no content 
+        was extracted (or, when awaiting another extraction, if that 
+        extraction failed)
+    """
+
+    if blob_key in _cached_keys:
+        _cached_keys.move_to_end(blob_key)
+        return _cached_keys[blob_key]
+
+    pending_extraction = _pending_extractions.get(blob_key)
+    if pending_extraction is not None:
+        # Shielded, so a cancelled caller does not cancel the extraction for everyone
+        return await asyncio.shield(pending_extraction)
+
+    pending_extraction = asyncio.get_running_loop().create_future()
+    _pending_extractions[blob_key] = pending_extraction
+    extracted_content_key = None
+    try:
+        extracted_content_key = await _extract_and_save(blob_key)
+        if extracted_content_key:
+            _cache_key(blob_key, extracted_content_key)
+        return extracted_content_key
+    finally:
+        pending_extraction.set_result(extracted_content_key)
+        del _pending_extractions[blob_key]
+
+async def main(downloadedContent: dict) -> str:
+    """Extracts text from the downloaded PDF file
     
     Parameters
     ----------
-    itemMetadata: dict
-        Meta data for the search result item to extract text from
-        needs to have the "downloaded_content" property set.
+    downloadedContent: dict
+        The downloaded content to extract text from:
+        {
+            'id': id of the search result item,
+            'blob_key': key of the downloaded content blob,
+            'content_type': content type as returned by the server,
+            'url': url the content was downloaded from
+        }
 
     Returns
     -------
-    dict
-        The Item metadata with teh property "extracted_content" set to
-        a string of extracted content.
+    str
+        Key of the blob with the extracted content (See `ExtractedContent`),
+        None if no content was extracted.
     """
 
     try:
-        async with BlobServiceClient.from_connection_string(Config.get_function_local_blob_connection_string()) as blob_service_client:
-            async with blob_service_client.get_blob_client(container = Config.get_blob_container_name(), blob = itemMetadata['downloaded_content']['blob_key']) as blob_client:
-                # Do not do anything else if the blob already exists
-                if await blob_client.exists():
-                    blob_downloader = await blob_client.download_blob()
-                    blob_content = BytesIO(await blob_downloader.readall())
-                    extracted = extract_text(blob_content)
-                    itemMetadata['extracted_content'] = extracted
-                else:
-                    itemMetadata['extracted_content'] = None
-
-                return itemMetadata
+        return await _get_extracted_content_key(downloadedContent['blob_key'])
 
     except Exception as e:
-        logging.exception(f'Failed extracting content from {itemMetadata["id"]}', exc_info=e)
-        itemMetadata['extracted_content'] = None
-        return itemMetadata
+        logging.exception(f'Failed extracting content from {downloadedContent["url"]}', exc_info=e)
+        return None
@@ -20,6 +20,9 @@ async def main(req: func.HttpRequest, starter: str) -> func.HttpResponse:
         Incoming http request that starts the lookup.
         Required a url parameter named:
         `name`: Name of the person to run adverse media search on
+        Optional url parameter:
+        `languages`: Comma separated list of language codes to search in
+                     (`nb-NO,sv-SE`). Defaults to all configured languages.
 
     starter: str
         Internal parameter, not used
@@ -51,9 +54,24 @@ async def main(req: func.HttpRequest, starter: str) -> func.HttpResponse:
             charset='utf-8'
         )
 
+    selected_languages = list(languages)
+    requested_languages = req.params.get('languages')
+    if requested_languages:
+        # Only search in requested languages that are configured,
+        # language codes are matched case insensitive
+        requested = {language.strip().lower() for language in requested_languages.split(',')}
+        selected_languages = [language for language in selected_languages if language.lower() in requested]
+        if not selected_languages:
+            return func.HttpResponse(
+                status_code=400,
+                body=f'None of the requested languages are configured, available languages: {", ".join(languages)}',
+                mimetype='text/plain',
+                charset='utf-8'
+            )
+
     # Start process
     client = df.DurableOrchestrationClient(starter)
-    instance_id = await client.start_new('OrchestrateSearch', None, (name, 3, [language for language in languages]))
+    instance_id = await client.start_new('OrchestrateSearch', None, (name, 3, selected_languages))
 
     logging.info(f"Started orchestration with ID = '{instance_id}'.")
 
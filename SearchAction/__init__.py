@@ -1,11 +1,91 @@
 """Executes a search towards google custom search engine"""
 
 import aiohttp
+import asyncio
 import Config
 import logging
+import orjson
+import random
 
 google_custom_search_url = 'https://www.googleapis.com/customsearch/v1'
 
+# Requests failing with these statuses are retried
+_retry_statuses = {429, 500, 502, 503, 504}
+_max_attempts = 5
+# Max number of seconds to wait between attempts
+_max_retry_delay = 30
+
+def _get_retry_delay(response: aiohttp.ClientResponse, attempt: int) -> float:
+    """Gets the number of seconds to wait before retrying a failed request
+    
+    Uses the `Retry-After` header if the server sent one (in seconds),
+    otherwise exponential backoff with jitter.
+
+    Parameters
+    ----------
+    response: aiohttp.ClientResponse
+        Response of the failed request
+    attempt: int
+        Zero based number of the failed attempt
+
+    Returns
+    -------
+    float
+        Seconds to wait
+    """
+
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return min(float(retry_after), _max_retry_delay)
+        except ValueError:
+            # Retry-After as a HTTP date is not supported, back off as usual
+            pass
+
+    return min((2 ** attempt) + random.random(), _max_retry_delay)
+
+async def _get_page(client: aiohttp.ClientSession, params: dict, start_index: int, search_term: str) -> dict:
+    """Gets a single page of search results
+
+    Parameters
+    ----------
+    client: aiohttp.ClientSession
+        Session to send the request with
+    params: dict
+        Query parameters of the search, except the start index
+    start_index: int
+        Index of the first result of the page
+    search_term: str
+        The name searched for (for logging)
+
+    Returns
+    -------
+    dict
+        The search response
+    """
+
+    for attempt in range(_max_attempts):
+        async with client.get(google_custom_search_url, params={**params, 'start': start_index}) as response:
+            # Transient failures (typically rate limiting) are retried
+            # instead of failing the whole language search
+            if response.status in _retry_statuses and attempt < _max_attempts - 1:
+                delay = _get_retry_delay(response, attempt)
+                logging.warning(f'Google search returned status {response.status} for {search_term}, retrying in {delay:.1f}s')
+            else:
+                try:
+                    response.raise_for_status()
+                    # Google always responds with UTF-8 encoded JSON,
+                    # so there is no need for aiohttp's content type checks
+                    return orjson.loads(await response.read())
+                except Exception as e:
+                    logging.exception(f'Failed to get google search results for {search_term}', exc_info=e)
+                    logging.error(f'Response status: {response.status}')
+                    content_as_text = await response.text()
+                    logging.error(f'Respone content: {content_as_text}')
+                    raise
+
+        await asyncio.sleep(delay)
+
 async def main(input: tuple[str,str,int]) -> str:
     """Search for given name in AML context within a provided language
     
@@ -40,31 +120,30 @@ async def main(input: tuple[str,str,int]) -> str:
     language_settings = languages[language]
 
     search_string = f'"{search_term}" AND ({language_settings["search_string"]})'
-    page = 1
-    nextIndex = 1
-    has_more_pages = True
-    all_results = []
-
-    async with aiohttp.ClientSession() as client:
-        while has_more_pages and page <= depth:
-            page = page + 1
-            async with client.get(f'{google_custom_search_url}?cx={language_settings["search_engine_id"]}&start={nextIndex}&key={google_api_key}&q={search_string}') as response:
-                try:
-                    response.raise_for_status()
-                    response_content = await response.json()
-                    all_results.append(response_content)
-
-                    # Check if more pages are available
-                    if 'queries' in response_content and 'nextPage' in response_content['queries']:
-                        has_more_pages = True
-                        nextIndex = response_content['queries']['nextPage'][0]['startIndex']
-                    else:
-                        has_more_pages = False
-                except Exception as e:
-                    logging.exception(f'Failed to get google search results for {search_term}', exc_info=e)
-                    logging.error(f'Response status: {response.status}')
-                    content_as_text = await response.text()
-                    logging.error(f'Respone content: {content_as_text}')
-                    raise
+    # Passed as parameters to have them properly url encoded
+    params = {
+        'cx': language_settings['search_engine_id'],
+        'key': google_api_key,
+        'q': search_string
+    }
+
+    client = await Config.get_http_session()
+    first_page = await _get_page(client, params, 1, search_term)
+    pages = [first_page]
+
+    # Pages have a fixed size, so once the first page tells us there are more
+    # results, all the remaining pages can be requested at once.
+    next_page = first_page.get('queries', {}).get('nextPage')
+    if depth > 1 and next_page:
+        next_index = next_page[0]['startIndex']
+        page_size = next_page[0].get('count', 10)
+        total_results = int(next_page[0].get('totalResults', next_index))
+        start_indexes = [next_index + page * page_size for page in range(depth - 1)]
+        pages.extend(await asyncio.gather(*[
+            _get_page(client, params, start_index, search_term) 
+            for start_index in start_indexes 
+            if start_index <= total_results
+        ]))
 
-    return [item for result in all_results for item in result['items']]
+    # Pages past the last result have no items
+    return [item for page in pages for item in page.get('items', [])]